@@ -1,18 +1,210 @@
 from bs4 import BeautifulSoup
 import concurrent.futures
+import hashlib
+import re
+import threading
+import uuid
+from pathlib import Path
+
+import pandas as pd
 import requests
+from urllib.parse import urlsplit, urlunsplit
+
+LISTING_DIR = Path("data") / "listings"
+LISTING_SCHEMA = {
+    "listing_id": "Int64",
+    "url": "string",
+    "make": "string",
+    "model": "string",
+    "price_huf": "Int64",
+    "mileage_km": "Int64",
+    "year": "Int64",
+}
+
+
+def normalizeLink(link):
+    # sort orders, page params and tracking tokens live in the query/fragment
+    parts = urlsplit(link)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+def simHash(links, bits=64):
+    weights = [0] * bits
+    for link in set(normalizeLink(link) for link in links):
+        digest = hashlib.blake2b(link.encode("utf-8"), digest_size=bits // 8).digest()
+        value = int.from_bytes(digest, "big")
+        for bit in range(bits):
+            if value >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+    fingerprint = 0
+    for bit in range(bits):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class SimHashIndex:
+    # Two fingerprints within maxDistance bits must agree on at least one of
+    # maxDistance + 1 blocks, so only pages sharing a block are compared.
+
+    def __init__(self, maxDistance=3, bits=64):
+        self.maxDistance = maxDistance
+        self.bits = bits
+        self.blockCount = maxDistance + 1
+        self.blockSize = -(-bits // self.blockCount)
+        self.buckets = {}
+
+    def blocks(self, fingerprint):
+        mask = (1 << self.blockSize) - 1
+        for block in range(self.blockCount):
+            yield block, fingerprint >> (block * self.blockSize) & mask
+
+    def findNear(self, fingerprint):
+        for key in self.blocks(fingerprint):
+            for other, url in self.buckets.get(key, []):
+                if bin(fingerprint ^ other).count("1") <= self.maxDistance:
+                    return url
+        return None
+
+    def add(self, fingerprint, url):
+        for key in self.blocks(fingerprint):
+            self.buckets.setdefault(key, []).append((fingerprint, url))
+
+
+def parseNumber(text):
+    # only the first grouped number, "3 490 000 Ft (€ 9 100)" is 3490000
+    number = re.search(r"\d[\d \u00a0]*", text or "")
+    return int(re.sub(r"\D", "", number.group())) if number else None
+
+
+def listingField(soup, label):
+    # the data sheet is a two column table: "Vételár:" | "3 490 000 Ft"
+    for cell in soup.find_all("td"):
+        if cell.get_text(strip=True).rstrip(":") == label:
+            value = cell.find_next_sibling("td")
+            if value is not None:
+                return value.get_text(" ", strip=True)
+    return None
+
+
+def parseListing(url, soup):
+    # https://www.hasznaltauto.hu/szemelyauto/<make>/<model>/<slug>-<id>
+    path = [part for part in urlsplit(url).path.split("/") if part]
+    if len(path) < 4 or path[0] != "szemelyauto":
+        return None
+    slug = path[-1]
+    listingId = re.search(r"-(\d+)$", slug)
+    # search pages and other sub paths under a model have no listing id
+    if listingId is None:
+        return None
+    mileage = parseNumber(listingField(soup, "Kilométeróra állása"))
+    if mileage is None:
+        slugMileage = re.search(r"(\d+)km", slug)
+        mileage = int(slugMileage.group(1)) if slugMileage else None
+    year = re.match(r"\s*(\d{4})", listingField(soup, "Évjárat") or "")
+    return {
+        "listing_id": int(listingId.group(1)),
+        "url": url,
+        "make": path[1],
+        "model": path[2],
+        "price_huf": parseNumber(listingField(soup, "Vételár")),
+        "mileage_km": mileage,
+        "year": int(year.group(1)) if year else None,
+    }
+
+
+class ListingWriter:
+    # Buffers at most batchSize records, then appends them to the dataset as a
+    # new part file, so memory stays flat however long the crawl runs.
+
+    def __init__(self, directory=LISTING_DIR, batchSize=10000):
+        self.directory = Path(directory)
+        self.batchSize = batchSize
+        self.records = []
+        self.written = 0
+        self.lock = threading.Lock()
+
+    def add(self, record):
+        batch = None
+        with self.lock:
+            self.records.append(record)
+            if len(self.records) >= self.batchSize:
+                batch, self.records = self.records, []
+        # the fetch threads keep adding records while a full batch is written
+        if batch is not None:
+            self.write(batch)
+
+    def write(self, batch):
+        df = pd.DataFrame(batch, columns=list(LISTING_SCHEMA))
+        df = df.astype(LISTING_SCHEMA)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        file = self.directory / f"part-{uuid.uuid4().hex}.parquet"
+        df.to_parquet(file, compression="snappy", index=False)
+        with self.lock:
+            self.written = self.written + len(df)
+
+    def close(self):
+        with self.lock:
+            batch, self.records = self.records, []
+        if batch:
+            self.write(batch)
+
 
 class LinkDownloader:
 
-    def __init__(self, numberOfThreads,mustHave):
+    def __init__(self, numberOfThreads,mustHave,maxDistance=3,listingWriter=None):
         self.numberOfThreads = numberOfThreads
         self.mustHave = mustHave
+        self.listingWriter = listingWriter
+        self.index = SimHashIndex(maxDistance)
+        self.duplicatePages = 0
+        self.duplicateUrls = set()
+        self.savedFetches = 0
+        self.savedLinks = set()
+
+    def isNearDuplicate(self,url,links):
+        # only result lists come in near-identical variants; listing pages share
+        # so much navigation that their link sets would look alike too
+        if "talalatilista" not in urlsplit(url).path:
+            return False
+        # a result page is fetched again whenever another page links to it
+        if url in self.duplicateUrls:
+            return True
+        # an empty link set has nothing to expand, do not let it shadow others
+        if not links:
+            return False
+        fingerprint = simHash(links)
+        match = self.index.findNear(fingerprint)
+        if match is not None and match != url:
+            self.duplicateUrls.add(url)
+            self.duplicatePages = self.duplicatePages + 1
+            return True
+        if match is None:
+            self.index.add(fingerprint, url)
+        return False
+
+    def countSavedFetches(self,skipped,*known):
+        # each pruned outlink counts once, and only if nothing else fetches it
+        for link in skipped:
+            if link in self.savedLinks:
+                continue
+            if any(link in links for links in known):
+                continue
+            self.savedLinks.add(link)
+            self.savedFetches = self.savedFetches + 1
+
     def getLinks(self,url):
         # print("url:",url)
         links = []
         r = requests.get(url)
         data = r.text
         soup = BeautifulSoup(data,"html.parser")
+        if self.listingWriter is not None:
+            record = parseListing(url, soup)
+            if record is not None:
+                self.listingWriter.add(record)
         for link in soup.find_all('a'):
             links.append(link.get('href'))
         returnValue = []
@@ -35,12 +227,16 @@ class LinkDownloader:
             future_to_url = {executor.submit(self.getLinks, url): url for url in urlList}
 
             data = []
+            skipped = []
             for future in concurrent.futures.as_completed(future_to_url):
                 url = future_to_url[future]
                 a = list(set(future.result()))
                 # print("a:",a)
-            data.extend(a)
-            return list(set(data))
+                if self.isNearDuplicate(url, a):
+                    skipped.extend(a)
+                else:
+                    data.extend(a)
+            return list(set(data)), set(skipped)
 
 
 
@@ -67,7 +263,6 @@ def cleanLinks(UrlList,mustHave):
 def searchInLinks(UrlList,terms):
     returnValue = []
     for link in UrlList:
-        print(terms,link)
         if link is None:
             pass
         else:
@@ -86,33 +281,46 @@ searchTerm = ["talalatilista","szemelyauto"]
 
 Continue = True
 
-links = [originalURL]
-seenLinks = [originalURL]
+if __name__ == "__main__":
+    links = [originalURL]
+    queuedLinks = {originalURL}
+    seenLinks = {originalURL}
 
-crawler = LinkDownloader(50,mustHave)
+    listingWriter = ListingWriter()
+    crawler = LinkDownloader(50,mustHave,listingWriter=listingWriter)
 
 
-# print(crawler.getLinksInPool(getLinks("https://www.hasznaltauto.hu/")))
+    # print(crawler.getLinksInPool(getLinks("https://www.hasznaltauto.hu/")))
 
-# links = []
-i = 1
-while len(links) > 0:
+    # links = []
+    i = 1
+    try:
+        while len(links) > 0:
 
-    nextPage = links.pop()
-    nextLinks = crawler.getLinksInPool(cleanLinks(getLinks(nextPage),mustHave))
-    nextLinks = list(set(nextLinks))
-    # cleanedLinks = cleanLinks(nextLinks,mustHave)
+            nextPage = links.pop()
+            queuedLinks.discard(nextPage)
+            pageLinks = crawler.getLinks(nextPage)
+            if crawler.isNearDuplicate(nextPage, pageLinks):
+                # skipping the expansion saves fetching and parsing its outlinks
+                crawler.countSavedFetches(pageLinks, seenLinks, queuedLinks)
+                seenLinks.add(nextPage)
+                continue
+            nextLinks, skipped = crawler.getLinksInPool(pageLinks)
+            nextLinks = set(nextLinks)
+            crawler.countSavedFetches(skipped, seenLinks, queuedLinks, nextLinks)
+            # cleanedLinks = cleanLinks(nextLinks,mustHave)
 
 
-    seenLinks.append(nextPage)
-    seenLinks = list(set(seenLinks))
-    for item in nextLinks:
-        if item not in seenLinks:
-            if item not in links:
-                links.append(item)
-                # print(item)
-    for item in links:
-        # print("itt:",item)
-        pass
-    print("links:",len(links),"seenlinks:",len(seenLinks))
-    i = i + 1
+            seenLinks.add(nextPage)
+            for item in nextLinks:
+                if item not in seenLinks:
+                    if item not in queuedLinks:
+                        links.append(item)
+                        queuedLinks.add(item)
+            print("links:",len(links),"seenlinks:",len(seenLinks),
+                  "duplicates:",crawler.duplicatePages,
+                  "saved fetches/parses:",crawler.savedFetches,
+                  "listings:",listingWriter.written)
+            i = i + 1
+    finally:
+        listingWriter.close()
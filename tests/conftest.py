@@ -0,0 +1,20 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def scraper():
+    """Import ``scraper.py`` from the repository root."""
+    pytest.importorskip("bs4")
+    pytest.importorskip("requests")
+    pytest.importorskip("pandas")
+
+    root = Path(__file__).resolve().parents[1]
+    spec = importlib.util.spec_from_file_location("scraper", root / "scraper.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["scraper"] = module
+    spec.loader.exec_module(module)
+    return module
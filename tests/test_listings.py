@@ -0,0 +1,125 @@
+import pytest
+
+LISTING_URL = (
+    "https://www.hasznaltauto.hu/szemelyauto/toyota/yaris/"
+    "toyota_yaris_1_33_terra_plusz_99000kmgyarifeny1tulajmo-i-13144077"
+)
+
+LISTING_HTML = """
+<table>
+  <tr><td>Vételár:</td><td>3 490 000 Ft (€ 9 100)</td></tr>
+  <tr><td>Évjárat:</td><td>2012/5</td></tr>
+  <tr><td>Kilométeróra állása:</td><td>123 456 km</td></tr>
+</table>
+"""
+
+
+def make_record(listing_id):
+    """Return a listing record as produced by ``parseListing``."""
+    return {
+        "listing_id": listing_id,
+        "url": f"https://www.hasznaltauto.hu/szemelyauto/a/b/x-{listing_id}",
+        "make": "a",
+        "model": "b",
+        "price_huf": 1000000,
+        "mileage_km": None,
+        "year": 2012,
+    }
+
+
+def test_parse_listing(scraper):
+    """Fields come from the data sheet and the listing URL."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(LISTING_HTML, "html.parser")
+    record = scraper.parseListing(LISTING_URL, soup)
+
+    assert record == {
+        "listing_id": 13144077,
+        "url": LISTING_URL,
+        "make": "toyota",
+        "model": "yaris",
+        "price_huf": 3490000,
+        "mileage_km": 123456,
+        "year": 2012,
+    }
+
+
+def test_parse_listing_mileage_from_slug(scraper):
+    """Without a mileage row the kilometres in the URL slug are used."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup("<table></table>", "html.parser")
+    record = scraper.parseListing(LISTING_URL, soup)
+
+    assert record["mileage_km"] == 99000
+    assert record["price_huf"] is None
+    assert record["year"] is None
+
+
+def test_parse_listing_ignores_other_pages(scraper):
+    """Result lists and other pages are not listings."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(LISTING_HTML, "html.parser")
+
+    results = "https://www.hasznaltauto.hu/talalatilista/ABC"
+    assert scraper.parseListing(results, soup) is None
+    assert scraper.parseListing("https://www.hasznaltauto.hu/szemelyauto", soup) is None
+
+
+def test_parse_listing_requires_id(scraper):
+    """Sub paths under a model without a ``-<id>`` suffix are not listings."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(LISTING_HTML, "html.parser")
+    model = "https://www.hasznaltauto.hu/szemelyauto/toyota/yaris"
+
+    assert scraper.parseListing(f"{model}/page2", soup) is None
+    assert scraper.parseListing(f"{model}/kereses/abc", soup) is None
+
+
+def test_parse_number_first_group_only(scraper):
+    """Separate numbers, including ones on other lines, are not joined."""
+    assert scraper.parseNumber("3 490 000 Ft (€ 9 100)") == 3490000
+    assert scraper.parseNumber("123\u00a0456 km") == 123456
+    assert scraper.parseNumber("1\n2") == 1
+    assert scraper.parseNumber(None) is None
+
+
+def test_writer_flushes_every_batch(scraper, tmp_path):
+    """Each ``batchSize`` records go to a new part file with the fixed schema."""
+    import pandas as pd
+
+    pytest.importorskip("pyarrow")
+
+    writer = scraper.ListingWriter(tmp_path, batchSize=2)
+    for listing_id in range(5):
+        writer.add(make_record(listing_id))
+
+    assert len(list(tmp_path.glob("part-*.parquet"))) == 2
+    assert writer.written == 4
+    assert len(writer.records) == 1
+
+    df = pd.read_parquet(tmp_path)
+    assert sorted(df["listing_id"]) == [0, 1, 2, 3]
+    dtypes = {col: str(dtype) for col, dtype in df.dtypes.items()}
+    assert dtypes == scraper.LISTING_SCHEMA
+
+
+def test_writer_close_flushes_leftovers(scraper, tmp_path):
+    """``close`` writes the records still buffered."""
+    import pandas as pd
+
+    pytest.importorskip("pyarrow")
+
+    writer = scraper.ListingWriter(tmp_path, batchSize=10)
+    for listing_id in range(3):
+        writer.add(make_record(listing_id))
+    assert not list(tmp_path.glob("part-*.parquet"))
+
+    writer.close()
+
+    assert len(list(tmp_path.glob("part-*.parquet"))) == 1
+    assert writer.written == 3
+    assert len(pd.read_parquet(tmp_path)) == 3
@@ -0,0 +1,79 @@
+def test_query_variants_match(scraper):
+    """Sort, page and tracking parameters do not change the fingerprint."""
+    base = [f"https://www.hasznaltauto.hu/szemelyauto/a/b/x-{i}" for i in range(30)]
+    variant = [f"{link}?sort={i % 3}&utm=zz" for i, link in enumerate(base)]
+
+    index = scraper.SimHashIndex()
+    index.add(scraper.simHash(base), "first")
+
+    assert index.findNear(scraper.simHash(base)) == "first"
+    assert index.findNear(scraper.simHash(variant)) == "first"
+
+
+def test_disjoint_link_sets_do_not_match(scraper):
+    """Pages listing different cars are not near-duplicates."""
+    first = [f"https://www.hasznaltauto.hu/szemelyauto/a/b/x-{i}" for i in range(30)]
+    second = [f"https://www.hasznaltauto.hu/szemelyauto/c/d/y-{i}" for i in range(30)]
+
+    index = scraper.SimHashIndex()
+    index.add(scraper.simHash(first), "first")
+
+    assert index.findNear(scraper.simHash(second)) is None
+
+
+def test_find_near_respects_max_distance(scraper):
+    """Fingerprints match up to ``maxDistance`` differing bits and no further."""
+    index = scraper.SimHashIndex(maxDistance=3)
+    fingerprint = 0x0123456789ABCDEF
+    index.add(fingerprint, "page")
+
+    # flip bits spread over different blocks so no block lookup is trivial
+    within = fingerprint ^ (1 << 0 | 1 << 17 | 1 << 33)
+    beyond = fingerprint ^ (1 << 0 | 1 << 17 | 1 << 33 | 1 << 49)
+
+    # four flipped bits in one block still share the other blocks
+    same_block = fingerprint ^ 0b1111
+
+    assert index.findNear(within) == "page"
+    assert index.findNear(beyond) is None
+    assert index.findNear(same_block) is None
+
+
+def test_only_result_pages_are_pruned(scraper):
+    """Listing pages sharing navigation links are never treated as duplicates."""
+    crawler = scraper.LinkDownloader(1, "https://www.hasznaltauto.hu/")
+    links = [f"https://www.hasznaltauto.hu/nav/{i}" for i in range(30)]
+
+    listing = "https://www.hasznaltauto.hu/szemelyauto/a/b/x-{}"
+    assert not crawler.isNearDuplicate(listing.format(1), links)
+    assert not crawler.isNearDuplicate(listing.format(2), links)
+
+    result = "https://www.hasznaltauto.hu/talalatilista/{}"
+    assert not crawler.isNearDuplicate(result.format("A"), links)
+    assert crawler.isNearDuplicate(result.format("B"), links)
+    assert crawler.duplicatePages == 1
+
+
+def test_duplicate_pages_are_counted_once(scraper):
+    """Fetching the same near-duplicate result page again is not a new duplicate."""
+    crawler = scraper.LinkDownloader(1, "https://www.hasznaltauto.hu/")
+    links = [f"https://www.hasznaltauto.hu/nav/{i}" for i in range(30)]
+
+    crawler.isNearDuplicate("https://www.hasznaltauto.hu/talalatilista/A", links)
+    for _ in range(3):
+        assert crawler.isNearDuplicate(
+            "https://www.hasznaltauto.hu/talalatilista/B", links)
+
+    assert crawler.duplicatePages == 1
+
+
+def test_saved_fetches_skip_known_links(scraper):
+    """Only pruned outlinks nothing else would fetch count, each once."""
+    crawler = scraper.LinkDownloader(1, "https://www.hasznaltauto.hu/")
+    seen = {"seen"}
+    queued = {"queued"}
+
+    crawler.countSavedFetches({"seen", "queued", "new", "other"}, seen, queued)
+    crawler.countSavedFetches({"new", "third"}, seen, queued, {"third"})
+
+    assert crawler.savedFetches == 2